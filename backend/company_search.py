@@ -1,12 +1,16 @@
 import asyncio
 import argparse
+import hashlib
+import hmac
 import json
 import logging
 import os
+import random
 import time
 from typing import Any, Dict, List, Tuple
 
 import httpx
+import orjson
 from langchain_core.output_parsers import StrOutputParser
 from langchain_core.prompts import ChatPromptTemplate
 from langchain_openai import ChatOpenAI
@@ -26,6 +30,11 @@ EXA_ENRICHMENTS: List[Tuple[str, str]] = [
     ("headquarters", "Headquarters location as city and country.")
 ]
 
+EXA_ENRICHMENTS_PAYLOAD: List[Dict[str, str]] = [
+    {"description": description, "format": "text"}
+    for _, description in EXA_ENRICHMENTS
+]
+
 IDEA_SUMMARY_PROMPT = ChatPromptTemplate.from_messages([
     (
         "system",
@@ -43,6 +52,19 @@ Rules:
 ])
 
 
+SUMMARY_CACHE_SIZE = 256
+
+IDEMPOTENT_METHODS = frozenset({"GET", "HEAD", "OPTIONS", "PUT", "DELETE"})
+# Failures raised before the request left the client. Only these are safe to
+# retry for a POST, which may otherwise have already created a webset.
+UNSENT_REQUEST_ERRORS = (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout)
+
+# With a webhook configured the status endpoint is still polled at this slow
+# interval, in case the delivery is lost or lands on another worker process.
+WEBHOOK_FALLBACK_POLL_SECONDS = 10.0
+WEBHOOK_SIGNATURE_TOLERANCE_SECONDS = 300
+
+
 def _clamp_competitor_limit(value: int, default: int = 25) -> int:
     return max(1, min(50, value or default))
 
@@ -55,11 +77,32 @@ class CompanySearchService:
         exa_api_key: str | None,
         exa_base_url: str = "https://api.exa.ai",
         summarizer_model: str = "gpt-4o-mini",
-        competitor_limit: int = 25
+        competitor_limit: int = 25,
+        webhook_url: str | None = None,
+        webhook_secret: str | None = None
     ) -> None:
         self.exa_api_key = exa_api_key
         self.exa_base_url = exa_base_url
         self.competitor_limit = _clamp_competitor_limit(competitor_limit)
+        if webhook_url and not webhook_secret:
+            # Unsigned deliveries are rejected, so waiting on them would only
+            # slow every search down to the fallback poll interval.
+            logger.warning("company_search.webhook.disabled reason=missing_secret")
+            webhook_url = None
+        self.webhook_url = webhook_url
+        self.webhook_secret = webhook_secret
+        self._webset_idle_events: Dict[str, asyncio.Event] = {}
+        self._summary_cache: Dict[str, str] = {}
+        self._exa_headers: Dict[str, str] = (
+            {"x-api-key": exa_api_key, "Content-Type": "application/json"} if exa_api_key else {}
+        )
+        self._client = httpx.AsyncClient(
+            base_url=exa_base_url,
+            headers=self._exa_headers,
+            timeout=60.0,
+            http2=True,
+            limits=httpx.Limits(max_connections=1000, max_keepalive_connections=100)
+        )
         self.summary_llm = ChatOpenAI(
             model=summarizer_model,
             api_key=openai_api_key,
@@ -79,32 +122,41 @@ class CompanySearchService:
             exa_api_key=os.getenv("EXA_API_KEY"),
             exa_base_url=os.getenv("EXA_BASE_URL", "https://api.exa.ai"),
             summarizer_model=os.getenv("OPENAI_SUMMARIZER_MODEL", "gpt-4o-mini"),
-            competitor_limit=competitor_limit
+            competitor_limit=competitor_limit,
+            webhook_url=os.getenv("EXA_WEBHOOK_URL") or None,
+            webhook_secret=os.getenv("EXA_WEBHOOK_SECRET") or None
         )
 
+    async def aclose(self) -> None:
+        await self._client.aclose()
+
     async def summarize_idea_for_company_search(self, idea: str) -> str:
         logger.info("company_search.summarize.start chars=%s", len(idea or ""))
+        cache_key = hashlib.sha256((idea or "").strip().lower().encode()).hexdigest()
+        cached = self._summary_cache.get(cache_key)
+        if cached is not None:
+            logger.info("company_search.summarize.cache_hit chars=%s", len(cached))
+            return cached
+
         chain = IDEA_SUMMARY_PROMPT | self.summary_llm | StrOutputParser()
         summary = (await chain.ainvoke({"idea": idea})).strip()
         summary = " ".join(summary.split())
         if summary and summary[-1] not in ".!?":
             summary += "."
+
+        if len(self._summary_cache) >= SUMMARY_CACHE_SIZE:
+            self._summary_cache.pop(next(iter(self._summary_cache)))
+        self._summary_cache[cache_key] = summary
         logger.info("company_search.summarize.done chars=%s", len(summary))
         return summary
 
-    def _get_exa_headers(self) -> Dict[str, str]:
-        if not self.exa_api_key:
-            raise RuntimeError("EXA_API_KEY not set")
-        return {
-            "x-api-key": self.exa_api_key,
-            "Content-Type": "application/json"
-        }
-
     def _stringify(self, value: Any) -> str:
-        if value is None:
-            return ""
+        # Plain strings are the common case, so check them before anything else.
+        # Strings are by far the most common enrichment value, so check them first.
         if isinstance(value, str):
             return " ".join(value.split())
+        if value is None:
+            return ""
         if isinstance(value, list):
             return " | ".join(part for part in (self._stringify(v) for v in value) if part)
         if isinstance(value, dict):
@@ -125,35 +177,6 @@ class CompanySearchService:
             return normalized
         return f"https://{normalized}"
 
-    def _extract_company_name(self, item: Dict[str, Any]) -> str:
-        properties = item.get("properties") if isinstance(item.get("properties"), dict) else {}
-        company_obj = properties.get("company") if isinstance(properties.get("company"), dict) else {}
-        return (
-            self._stringify(company_obj.get("name"))
-            or self._stringify(properties.get("name"))
-            or self._stringify(item.get("title"))
-            or "Unknown"
-        )
-
-    def _extract_company_description(self, item: Dict[str, Any]) -> str:
-        properties = item.get("properties") if isinstance(item.get("properties"), dict) else {}
-        return (
-            self._stringify(properties.get("description"))
-            or self._stringify(properties.get("summary"))
-            or self._stringify(item.get("snippet"))
-            or "Unknown"
-        )
-
-    def _extract_website(self, item: Dict[str, Any]) -> str:
-        properties = item.get("properties") if isinstance(item.get("properties"), dict) else {}
-        domain = self._stringify(properties.get("domain"))
-        return (
-            self._normalize_url(self._stringify(item.get("url")))
-            or self._normalize_url(self._stringify(properties.get("website")))
-            or self._normalize_url(domain)
-            or "Unknown"
-        )
-
     def _extract_enrichment_values(self, item: Dict[str, Any]) -> Dict[str, str]:
         raw_enrichments = item.get("enrichments")
         if isinstance(raw_enrichments, dict):
@@ -163,11 +186,49 @@ class CompanySearchService:
         else:
             enrichments = []
 
-        values: Dict[str, str] = {}
-        for index, (field_name, _) in enumerate(EXA_ENRICHMENTS):
-            value = self._stringify(enrichments[index]) if index < len(enrichments) else ""
-            values[field_name] = value or "Unknown"
-        return values
+        stringify = self._stringify
+        count = len(enrichments)
+        return {
+            field_name: (stringify(enrichments[index]) if index < count else "") or "Unknown"
+            for index, (field_name, _) in enumerate(EXA_ENRICHMENTS)
+        }
+
+    async def _request_with_retry(
+        self,
+        client: httpx.AsyncClient,
+        method: str,
+        url: str,
+        *,
+        retries: int = 3,
+        **kwargs: Any
+    ) -> httpx.Response:
+        idempotent = method.upper() in IDEMPOTENT_METHODS
+        retryable_errors = (httpx.TimeoutException, httpx.ConnectError) if idempotent else UNSENT_REQUEST_ERRORS
+        attempt = 0
+        while True:
+            try:
+                response = await client.request(method, url, **kwargs)
+            except retryable_errors as exc:
+                if attempt >= retries:
+                    raise
+                reason = type(exc).__name__
+            else:
+                # 4xx responses are not retryable; 5xx are retried until attempts
+                # run out, but only for idempotent methods.
+                if response.status_code < 500 or not idempotent or attempt >= retries:
+                    response.raise_for_status()
+                    return response
+                reason = f"status_{response.status_code}"
+
+            logger.warning(
+                "company_search.exa.retry method=%s url=%s attempt=%s reason=%s",
+                method,
+                url,
+                attempt + 1,
+                reason
+            )
+            await asyncio.sleep(0.25 * 2 ** attempt)
+            attempt += 1
 
     async def _create_company_webset(self, client: httpx.AsyncClient, search_sentence: str, limit: int) -> str:
         logger.info("company_search.webset.create.start limit=%s", limit)
@@ -177,19 +238,11 @@ class CompanySearchService:
                 "count": limit,
                 "entity": {"type": "company"}
             },
-            "enrichments": [
-                {"description": description, "format": "text"}
-                for _, description in EXA_ENRICHMENTS
-            ]
+            "enrichments": EXA_ENRICHMENTS_PAYLOAD
         }
 
-        response = await client.post(
-            f"{self.exa_base_url}/websets/v0/websets",
-            json=payload,
-            headers=self._get_exa_headers()
-        )
-        response.raise_for_status()
-        data = response.json()
+        response = await self._request_with_retry(client, "POST", "/websets/v0/websets", json=payload)
+        data = orjson.loads(response.content)
 
         webset_id = data.get("id") or data.get("websetId")
         if not webset_id:
@@ -197,19 +250,63 @@ class CompanySearchService:
             webset_id = webset.get("id")
         if not webset_id:
             raise RuntimeError("Exa response did not include a webset id")
+        if self.webhook_url:
+            self._webset_idle_events[webset_id] = asyncio.Event()
         logger.info("company_search.webset.create.done webset_id=%s", webset_id)
         return webset_id
 
-    async def _wait_for_webset_idle(self, client: httpx.AsyncClient, webset_id: str, timeout_seconds: int = 90) -> None:
-        deadline = time.monotonic() + timeout_seconds
-        logger.info("company_search.webset.wait.start webset_id=%s timeout=%s", webset_id, timeout_seconds)
-        while time.monotonic() < deadline:
-            response = await client.get(
-                f"{self.exa_base_url}/websets/v0/websets/{webset_id}",
-                headers=self._get_exa_headers()
-            )
-            response.raise_for_status()
-            data = response.json()
+    def verify_webhook_signature(self, body: bytes, signature_header: str | None) -> bool:
+        if not self.webhook_secret or not signature_header:
+            return False
+
+        # Exa-Signature header: "t=<unix timestamp>,v1=<hex hmac-sha256 of '<t>.<body>'>"
+        timestamp = ""
+        signatures: List[str] = []
+        for part in signature_header.split(","):
+            key, _, value = part.strip().partition("=")
+            if key == "t":
+                timestamp = value
+            elif key == "v1":
+                signatures.append(value)
+
+        try:
+            signed_at = int(timestamp)
+        except ValueError:
+            return False
+        if abs(time.time() - signed_at) > WEBHOOK_SIGNATURE_TOLERANCE_SECONDS:
+            return False
+
+        expected = hmac.new(
+            self.webhook_secret.encode(),
+            timestamp.encode() + b"." + body,
+            hashlib.sha256
+        ).hexdigest()
+        return any(hmac.compare_digest(expected, signature) for signature in signatures)
+
+    def handle_webhook_event(self, event: Dict[str, Any]) -> bool:
+        event_type = self._stringify(event.get("type")).lower()
+        data = event.get("data") if isinstance(event.get("data"), dict) else {}
+        webset_id = self._stringify(data.get("id") or data.get("websetId"))
+        idle_event = self._webset_idle_events.get(webset_id)
+        if event_type != "webset.idle" or idle_event is None:
+            logger.debug("company_search.webhook.ignored type=%s webset_id=%s", event_type or "unknown", webset_id or "unknown")
+            return False
+
+        idle_event.set()
+        logger.info("company_search.webhook.idle webset_id=%s", webset_id)
+        return True
+
+    async def _poll_until_webset_idle(
+        self,
+        client: httpx.AsyncClient,
+        webset_id: str,
+        *,
+        delay: float,
+        max_delay: float
+    ) -> str:
+        while True:
+            response = await self._request_with_retry(client, "GET", f"/websets/v0/websets/{webset_id}")
+            data = orjson.loads(response.content)
 
             status = self._stringify(data.get("status")).lower()
             if not status:
@@ -217,62 +314,122 @@ class CompanySearchService:
                 status = self._stringify(webset.get("status")).lower()
 
             if status in {"idle", "done", "completed"}:
-                logger.info("company_search.webset.wait.done webset_id=%s status=%s", webset_id, status)
-                return
+                return status
             if status in {"failed", "error", "cancelled"}:
                 raise RuntimeError(f"Exa webset finished with status: {status}")
 
             logger.debug("company_search.webset.wait.poll webset_id=%s status=%s", webset_id, status or "unknown")
-            await asyncio.sleep(2)
+            await asyncio.sleep(delay + random.uniform(0, 0.1 * delay))
+            delay = min(max_delay, delay * 1.5)
+
+    async def _wait_for_webhook_or_poll(self, client: httpx.AsyncClient, webset_id: str, idle_event: asyncio.Event) -> str:
+        webhook_task = asyncio.create_task(idle_event.wait())
+        poll_task = asyncio.create_task(self._poll_until_webset_idle(
+            client,
+            webset_id,
+            delay=WEBHOOK_FALLBACK_POLL_SECONDS,
+            max_delay=WEBHOOK_FALLBACK_POLL_SECONDS
+        ))
+        try:
+            done, _ = await asyncio.wait({webhook_task, poll_task}, return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            webhook_task.cancel()
+            poll_task.cancel()
+            # Reap the loser so a failure racing the winner isn't reported as never retrieved.
+            await asyncio.gather(webhook_task, poll_task, return_exceptions=True)
+
+        if webhook_task in done:
+            return "idle"
+        logger.info("company_search.webset.wait.poll_fallback webset_id=%s", webset_id)
+        return poll_task.result()
 
-        raise TimeoutError("Timed out while waiting for Exa webset to complete")
+    async def _wait_for_webset_idle(self, client: httpx.AsyncClient, webset_id: str, timeout_seconds: int = 90) -> None:
+        idle_event = self._webset_idle_events.get(webset_id)
+        mode = "poll" if idle_event is None else "webhook"
+        logger.info("company_search.webset.wait.start webset_id=%s timeout=%s mode=%s", webset_id, timeout_seconds, mode)
+        if idle_event is None:
+            waiter = self._poll_until_webset_idle(client, webset_id, delay=0.25, max_delay=3.0)
+        else:
+            waiter = self._wait_for_webhook_or_poll(client, webset_id, idle_event)
+
+        try:
+            status = await asyncio.wait_for(waiter, timeout_seconds)
+        except TimeoutError:
+            raise TimeoutError("Timed out while waiting for Exa webset to complete") from None
+        finally:
+            self._webset_idle_events.pop(webset_id, None)
+        logger.info("company_search.webset.wait.done webset_id=%s status=%s", webset_id, status)
+
+    def _parse_items_page(self, data: Dict[str, Any]) -> Tuple[List[Dict[str, Any]], Any]:
+        batch = data.get("data") if isinstance(data.get("data"), list) else data.get("items")
+        if not isinstance(batch, list):
+            return [], None
+        return [item for item in batch if isinstance(item, dict)], data.get("nextOffset")
 
     async def _fetch_webset_items(self, client: httpx.AsyncClient, webset_id: str, limit: int) -> List[Dict[str, Any]]:
         logger.info("company_search.items.fetch.start webset_id=%s limit=%s", webset_id, limit)
-        items: List[Dict[str, Any]] = []
-        offset = 0
+        url = f"/websets/v0/websets/{webset_id}/items"
+        pages = [(offset, min(100, limit - offset)) for offset in range(0, limit, 100)]
+        responses = await asyncio.gather(*(
+            self._request_with_retry(client, "GET", url, params={"limit": size, "offset": offset})
+            for offset, size in pages
+        ))
 
-        while len(items) < limit:
-            response = await client.get(
-                f"{self.exa_base_url}/websets/v0/websets/{webset_id}/items",
-                params={"limit": min(100, limit - len(items)), "offset": offset},
-                headers=self._get_exa_headers()
-            )
-            response.raise_for_status()
-            data = response.json()
-
-            batch = data.get("data") if isinstance(data.get("data"), list) else data.get("items")
-            if not isinstance(batch, list) or not batch:
+        items: List[Dict[str, Any]] = []
+        next_offset = None
+        for (_, size), response in zip(pages, responses):
+            batch, next_offset = self._parse_items_page(orjson.loads(response.content))
+            items.extend(batch)
+            if next_offset is None or len(batch) < size:
                 break
 
-            for item in batch:
-                if isinstance(item, dict):
-                    items.append(item)
-                    if len(items) >= limit:
-                        break
-
-            next_offset = data.get("nextOffset")
-            if next_offset is None:
+        # Exa can return short pages; keep following its offset until the limit is met.
+        while len(items) < limit and next_offset is not None:
+            response = await self._request_with_retry(
+                client,
+                "GET",
+                url,
+                params={"limit": min(100, limit - len(items)), "offset": int(next_offset)}
+            )
+            batch, next_offset = self._parse_items_page(orjson.loads(response.content))
+            if not batch:
                 break
-            offset = int(next_offset)
+            items.extend(batch)
 
         logger.info("company_search.items.fetch.done webset_id=%s count=%s", webset_id, len(items[:limit]))
         return items[:limit]
 
     def _format_competitor(self, item: Dict[str, Any], rank: int) -> Dict[str, Any]:
-        enrichment_values = self._extract_enrichment_values(item)
+        stringify = self._stringify
+        normalize_url = self._normalize_url
+        properties = item.get("properties")
+        if not isinstance(properties, dict):
+            properties = {}
+        company = properties.get("company")
+        if not isinstance(company, dict):
+            company = {}
+
         return {
             "rank": rank,
-            "company_name": self._extract_company_name(item),
-            "website": self._extract_website(item),
-            "description": self._extract_company_description(item),
-            "company_differentiator": enrichment_values["company_differentiator"],
-            "funding": enrichment_values["funding"],
-            "revenue": enrichment_values["revenue"],
-            "employees": enrichment_values["employees"],
-            "founded_year": enrichment_values["founded_year"],
-            "target_customer": enrichment_values["target_customer"],
-            "headquarters": enrichment_values["headquarters"]
+            "company_name": (
+                stringify(company.get("name"))
+                or stringify(properties.get("name"))
+                or stringify(item.get("title"))
+                or "Unknown"
+            ),
+            "website": (
+                normalize_url(stringify(item.get("url")))
+                or normalize_url(stringify(properties.get("website")))
+                or normalize_url(stringify(properties.get("domain")))
+                or "Unknown"
+            ),
+            "description": (
+                stringify(properties.get("description"))
+                or stringify(properties.get("summary"))
+                or stringify(item.get("snippet"))
+                or "Unknown"
+            ),
+            **self._extract_enrichment_values(item)
         }
 
     async def find_top_competitors_for_idea(self, idea: str, limit: int | None = None) -> Dict[str, Any]:
@@ -291,10 +448,9 @@ class CompanySearchService:
             }
 
         try:
-            async with httpx.AsyncClient(timeout=60.0) as client:
-                webset_id = await self._create_company_webset(client, search_sentence, safe_limit)
-                await self._wait_for_webset_idle(client, webset_id)
-                items = await self._fetch_webset_items(client, webset_id, safe_limit)
+            webset_id = await self._create_company_webset(self._client, search_sentence, safe_limit)
+            await self._wait_for_webset_idle(self._client, webset_id)
+            items = await self._fetch_webset_items(self._client, webset_id, safe_limit)
         except Exception:
             logger.exception("company_search.run.failed")
             raise
@@ -346,8 +502,15 @@ def cli_main() -> int:
         return 1
 
     service = CompanySearchService.from_env(openai_api_key)
+
+    async def _run() -> Dict[str, Any]:
+        try:
+            return await service.find_top_competitors_for_idea(args.idea, limit=args.limit)
+        finally:
+            await service.aclose()
+
     try:
-        result = asyncio.run(service.find_top_competitors_for_idea(args.idea, limit=args.limit))
+        result = asyncio.run(_run())
     except Exception:
         logger.exception("company_search.cli.failed")
         return 1
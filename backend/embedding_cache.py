@@ -0,0 +1,45 @@
+from __future__ import annotations
+
+import hashlib
+
+from langchain_core.embeddings import Embeddings
+
+
+def _text_key(text: str) -> str:
+    return hashlib.sha256(text.encode()).hexdigest()
+
+
+class CachedEmbeddings(Embeddings):
+    # Only query vectors are cached: repeated documents are already served from
+    # their persisted Chroma collection, and chunks rarely repeat across documents.
+    def __init__(self, underlying: Embeddings, max_entries: int = 64) -> None:
+        self.underlying = underlying
+        self.max_entries = max_entries
+        self._query_vectors: dict[str, list[float]] = {}
+
+    def _remember(self, key: str, vector: list[float]) -> None:
+        if len(self._query_vectors) >= self.max_entries:
+            self._query_vectors.pop(next(iter(self._query_vectors)))
+        self._query_vectors[key] = vector
+
+    def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        return self.underlying.embed_documents(texts)
+
+    async def aembed_documents(self, texts: list[str]) -> list[list[float]]:
+        return await self.underlying.aembed_documents(texts)
+
+    def embed_query(self, text: str) -> list[float]:
+        key = _text_key(text)
+        vector = self._query_vectors.get(key)
+        if vector is None:
+            vector = self.underlying.embed_query(text)
+            self._remember(key, vector)
+        return vector
+
+    async def aembed_query(self, text: str) -> list[float]:
+        key = _text_key(text)
+        vector = self._query_vectors.get(key)
+        if vector is None:
+            vector = await self.underlying.aembed_query(text)
+            self._remember(key, vector)
+        return vector
@@ -1,17 +1,26 @@
 import asyncio
+import hashlib
+import json
 import os
+import time
+
+import chromadb
 from dotenv import load_dotenv
-from fastapi import FastAPI, File, Form, HTTPException, UploadFile
-from typing import Any, Dict
+from fastapi import FastAPI, File, Form, HTTPException, Request, UploadFile
+from fastapi.responses import StreamingResponse
+from typing import Any, BinaryIO, Dict
 
 from company_search import CompanySearchService
+from embedding_cache import CachedEmbeddings
 # from social_signals import SocialSignalsService
 from langchain_openai import ChatOpenAI, OpenAIEmbeddings
 from langchain_community.vectorstores import Chroma
+from langchain_core.caches import InMemoryCache
+from langchain_core.globals import set_llm_cache
 from langchain_core.prompts import ChatPromptTemplate
 from langchain_core.output_parsers import StrOutputParser
 
-from langgraph.graph import StateGraph, END
+from langgraph.graph import StateGraph, START, END
 
 from pdf_ingest import extract_pdf_text
 from text_chunking import chunk_text
@@ -27,6 +36,9 @@ if not OPENAI_API_KEY:
     raise RuntimeError("OPENAI_API_KEY not set")
 
 ANALYSIS_MODEL = os.getenv("OPENAI_ANALYSIS_MODEL", "gpt-4o")
+CHROMA_PERSIST_DIRECTORY = os.getenv("CHROMA_PERSIST_DIRECTORY", "./.chroma")
+CHROMA_MAX_VIEW_COLLECTIONS = max(1, int(os.getenv("CHROMA_MAX_VIEW_COLLECTIONS", "200")))
+VIEW_COLLECTION_PREFIX = "view-"
 
 analysis_llm = ChatOpenAI(
     model=ANALYSIS_MODEL,
@@ -34,26 +46,95 @@ analysis_llm = ChatOpenAI(
     temperature=0.3
 )
 
-embeddings = OpenAIEmbeddings(api_key=OPENAI_API_KEY)
+embeddings = CachedEmbeddings(OpenAIEmbeddings(api_key=OPENAI_API_KEY, chunk_size=1000))
+chroma_client = chromadb.PersistentClient(path=CHROMA_PERSIST_DIRECTORY)
 company_search_service = CompanySearchService.from_env(OPENAI_API_KEY)
 # social_signals_service = SocialSignalsService.from_env()
 
+
+@app.on_event("startup")
+async def configure_llm_cache():
+    set_llm_cache(InMemoryCache(maxsize=1024))
+
+
+@app.on_event("shutdown")
+async def close_clients():
+    await company_search_service.aclose()
+
+
 # -------------------------------------------------------------------
 # Shared RAG Utilities
 # -------------------------------------------------------------------
-def build_retriever(content: str):
+def open_vector_store(collection_name: str) -> tuple[Chroma, chromadb.Collection, int]:
+    collection = chroma_client.get_or_create_collection(collection_name, embedding_function=None)
+    vector_store = Chroma(
+        client=chroma_client,
+        collection_name=collection_name,
+        embedding_function=embeddings
+    )
+    return vector_store, collection, collection.count()
+
+
+def prune_view_collections(keep: str) -> None:
+    indexed = sorted(
+        ((collection.metadata or {}).get("created_at", 0), collection.name)
+        for collection in chroma_client.list_collections()
+        if collection.name.startswith(VIEW_COLLECTION_PREFIX) and collection.name != keep
+    )
+    excess = len(indexed) + 1 - CHROMA_MAX_VIEW_COLLECTIONS
+    for _, name in indexed[:max(0, excess)]:
+        chroma_client.delete_collection(name)
+
+
+def index_view_chunks(
+    collection: chromadb.Collection,
+    ids: list[str],
+    vectors: list[list[float]],
+    documents: list[str]
+) -> None:
+    collection.add(ids=ids, embeddings=vectors, documents=documents)
+    collection.modify(metadata={"created_at": time.time()})
+    prune_view_collections(keep=collection.name)
+
+
+async def build_vector_store(content: str) -> Chroma:
+    content_key = hashlib.sha256(content.encode()).hexdigest()[:32]
+    # Opening and counting the collection hit Chroma's SQLite store, so keep
+    # them off the event loop.
+    vector_store, collection, indexed_count = await asyncio.to_thread(
+        open_vector_store,
+        f"{VIEW_COLLECTION_PREFIX}{content_key}"
+    )
+    if indexed_count > 0:
+        return vector_store
+
     chunks = chunk_text(content)
     if not chunks:
         raise ValueError("No content available to index")
 
-    vector_store = Chroma.from_documents(chunks, embeddings)
-    return vector_store.as_retriever()
+    # Embed every chunk in one batched async request and hand the vectors to
+    # the collection directly, so Chroma never calls the embedder itself.
+    # Indexing a new view also evicts the oldest view collections past
+    # CHROMA_MAX_VIEW_COLLECTIONS.
+    documents = [chunk.page_content for chunk in chunks]
+    vectors = await embeddings.aembed_documents(documents)
+    await asyncio.to_thread(
+        index_view_chunks,
+        collection,
+        [f"{content_key}-{index}" for index in range(len(chunks))],
+        vectors,
+        documents
+    )
+    return vector_store
 
 
 def format_docs(docs):
     return "\n\n".join(doc.page_content for doc in docs)
 
 
+ANALYSIS_QUERY = "full startup analysis: financials, tech, market, product, investment"
+
+
 # -------------------------------------------------------------------
 # Agent Prompt Templates
 # -------------------------------------------------------------------
@@ -113,65 +194,35 @@ PRODUCT_PROMPT = agent_prompt(
 # Agent Nodes
 # -------------------------------------------------------------------
 async def financial_agent(state):
-    retriever = state["retriever"]
-    chain = (
-        {"context": retriever | format_docs}
-        | FINANCIAL_PROMPT
-        | analysis_llm
-        | StrOutputParser()
-    )
-    return {"financial": await chain.ainvoke("")}
+    chain = FINANCIAL_PROMPT | analysis_llm | StrOutputParser()
+    return {"financial": await chain.ainvoke({"context": state["context"]})}
 
 
 async def vc_agent(state):
-    retriever = state["retriever"]
-    chain = (
-        {"context": retriever | format_docs}
-        | VC_PROMPT
-        | analysis_llm
-        | StrOutputParser()
-    )
-    return {"vc": await chain.ainvoke("")}
+    chain = VC_PROMPT | analysis_llm | StrOutputParser()
+    return {"vc": await chain.ainvoke({"context": state["context"]})}
 
 
 async def cto_agent(state):
-    retriever = state["retriever"]
-    chain = (
-        {"context": retriever | format_docs}
-        | CTO_PROMPT
-        | analysis_llm
-        | StrOutputParser()
-    )
-    return {"cto": await chain.ainvoke("")}
+    chain = CTO_PROMPT | analysis_llm | StrOutputParser()
+    return {"cto": await chain.ainvoke({"context": state["context"]})}
 
 
 async def marketing_agent(state):
-    retriever = state["retriever"]
-    chain = (
-        {"context": retriever | format_docs}
-        | MARKETING_PROMPT
-        | analysis_llm
-        | StrOutputParser()
-    )
-    return {"marketing": await chain.ainvoke("")}
+    chain = MARKETING_PROMPT | analysis_llm | StrOutputParser()
+    return {"marketing": await chain.ainvoke({"context": state["context"]})}
 
 
 async def product_agent(state):
-    retriever = state["retriever"]
-    chain = (
-        {"context": retriever | format_docs}
-        | PRODUCT_PROMPT
-        | analysis_llm
-        | StrOutputParser()
-    )
-    return {"product": await chain.ainvoke("")}
+    chain = PRODUCT_PROMPT | analysis_llm | StrOutputParser()
+    return {"product": await chain.ainvoke({"context": state["context"]})}
 
 
 # -------------------------------------------------------------------
 # LangGraph Definition (Parallel Agents)
 # -------------------------------------------------------------------
 class GraphState(dict):
-    retriever: any
+    context: str
     financial: str
     vc: str
     cto: str
@@ -187,51 +238,120 @@ graph.add_node("cto_agent", cto_agent)
 graph.add_node("marketing_agent", marketing_agent)
 graph.add_node("product_agent", product_agent)
 
-# Parallel execution
-graph.set_entry_point("financial_agent")
+# Parallel execution: every agent fans out from START and joins at END
+for agent_name in ("financial_agent", "vc_agent", "cto_agent", "marketing_agent", "product_agent"):
+    graph.add_edge(START, agent_name)
+    graph.add_edge(agent_name, END)
 
-graph.add_edge("financial_agent", "vc_agent")
-graph.add_edge("financial_agent", "cto_agent")
-graph.add_edge("financial_agent", "marketing_agent")
-graph.add_edge("financial_agent", "product_agent")
+app_graph = graph.compile()
 
-graph.add_edge("financial_agent", END)
-graph.add_edge("vc_agent", END)
-graph.add_edge("cto_agent", END)
-graph.add_edge("marketing_agent", END)
-graph.add_edge("product_agent", END)
 
-app_graph = graph.compile()
+ANALYSIS_RESPONSE_KEYS = {
+    "financial": "financial_analysis",
+    "vc": "vc_analysis",
+    "cto": "cto_analysis",
+    "marketing": "marketing_analysis",
+    "product": "product_analysis"
+}
+
+
+async def retrieve_analysis_context(content: str) -> str:
+    # ANALYSIS_QUERY is fixed, so after the first request its vector comes from the embedding cache.
+    vector_store, query_vector = await asyncio.gather(
+        build_vector_store(content),
+        embeddings.aembed_query(ANALYSIS_QUERY)
+    )
+    docs = await vector_store.asimilarity_search_by_vector(query_vector, k=4)
+    return format_docs(docs)
+
+
+async def run_analysis(content: str):
+    return await app_graph.ainvoke({"context": await retrieve_analysis_context(content)})
+
+
+async def stream_analysis(content: str):
+    context = await retrieve_analysis_context(content)
+    async for update in app_graph.astream({"context": context}, stream_mode="updates"):
+        for node_output in update.values():
+            yield node_output
 
 
 # -------------------------------------------------------------------
 # API Endpoint
 # -------------------------------------------------------------------
+async def extract_uploads(files: list[UploadFile] | None) -> list[str]:
+    if not files:
+        return []
+
+    extraction_results = await asyncio.gather(
+        *(asyncio.to_thread(extract_pdf_text, upload.file) for upload in files),
+        return_exceptions=True
+    )
+    extracted_texts: list[str] = []
+    for upload, result in zip(files, extraction_results):
+        if isinstance(result, Exception):
+            raise HTTPException(
+                status_code=400,
+                detail=f"PDF extraction failed for {upload.filename}: {result}"
+            )
+        extracted_texts.append(result)
+    return extracted_texts
+
+
+def competitor_response_fields(competitors_result: Dict[str, Any] | Exception) -> Dict[str, Any]:
+    if isinstance(competitors_result, Exception):
+        return {
+            "competitor_search_status": "error",
+            "idea_search_sentence": None,
+            "competitors": [],
+            "competitor_search_error": str(competitors_result)
+        }
+    return {
+        "competitor_search_status": competitors_result.get("status"),
+        "idea_search_sentence": competitors_result.get("search_sentence"),
+        "competitors": competitors_result.get("competitors", []),
+        "competitor_search_error": competitors_result.get("error")
+    }
+
+
+def sse_event(payload: Dict[str, Any]) -> str:
+    return f"data: {json.dumps(payload)}\n\n"
+
+
+VIEW_RESPONSE_CACHE_SIZE = 256
+_view_response_cache: Dict[str, Dict[str, Any]] = {}
+
+
+def _file_digest(fp: BinaryIO) -> str:
+    fp.seek(0)
+    return hashlib.file_digest(fp, "sha256").hexdigest()
+
+
+async def view_cache_key(prompt: str, files: list[UploadFile] | None) -> str:
+    file_digests = await asyncio.gather(
+        *(asyncio.to_thread(_file_digest, upload.file) for upload in files or [])
+    )
+    return hashlib.sha256("|".join([prompt, *sorted(file_digests)]).encode()).hexdigest()
+
+
 @app.post("/view")
 async def view_analysis(
     prompt: str = Form(...),
     files: list[UploadFile] | None = File(None)
 ):
-    if not prompt.strip():
+    prompt = " ".join(prompt.split())
+    if not prompt:
         raise HTTPException(status_code=400, detail="Prompt cannot be empty")
 
-    extracted_texts: list[str] = []
-    if files:
-        for upload in files:
-            try:
-                file_bytes = await upload.read()
-                extracted_texts.append(extract_pdf_text(file_bytes))
-            except Exception as exc:
-                raise HTTPException(
-                    status_code=400,
-                    detail=f"PDF extraction failed for {upload.filename}: {exc}"
-                )
+    cache_key = await view_cache_key(prompt, files)
+    cached_response = _view_response_cache.get(cache_key)
+    if cached_response is not None:
+        return cached_response
 
+    extracted_texts = await extract_uploads(files)
     combined_text = "\n\n".join([text for text in [prompt, *extracted_texts] if text])
 
-    analysis_task = app_graph.ainvoke({
-        "retriever": build_retriever(combined_text)
-    })
+    analysis_task = run_analysis(combined_text)
     competitors_task = company_search_service.find_top_competitors_for_idea(prompt)
     # social_signals_task = social_signals_service.summarize_customer_voice_signals(request.prompt)
 
@@ -250,36 +370,93 @@ async def view_analysis(
         raise HTTPException(status_code=500, detail=f"Analysis failed: {analysis_result}")
 
     response: Dict[str, Any] = {
-        "financial_analysis": analysis_result.get("financial"),
-        "vc_analysis": analysis_result.get("vc"),
-        "cto_analysis": analysis_result.get("cto"),
-        "marketing_analysis": analysis_result.get("marketing"),
-        "product_analysis": analysis_result.get("product")
+        response_key: analysis_result.get(state_key)
+        for state_key, response_key in ANALYSIS_RESPONSE_KEYS.items()
     }
-
-    if isinstance(competitors_result, Exception):
-        response.update({
-            "competitor_search_status": "error",
-            "idea_search_sentence": None,
-            "competitors": [],
-            "competitor_search_error": str(competitors_result)
-        })
-    else:
-        response.update({
-            "competitor_search_status": competitors_result.get("status"),
-            "idea_search_sentence": competitors_result.get("search_sentence"),
-            "competitors": competitors_result.get("competitors", []),
-            "competitor_search_error": competitors_result.get("error")
-        })
+    response.update(competitor_response_fields(competitors_result))
 
     # if isinstance(social_signals_result, Exception):
     #     response["customer_voice_pmf_signal"] = "Customer-voice PMF signal is unavailable due to social-source collection error."
     # else:
     #     response["customer_voice_pmf_signal"] = social_signals_result
 
+    # Don't pin a transient competitor-search failure for later resubmissions.
+    if response["competitor_search_status"] != "error":
+        if len(_view_response_cache) >= VIEW_RESPONSE_CACHE_SIZE:
+            _view_response_cache.pop(next(iter(_view_response_cache)))
+        _view_response_cache[cache_key] = response
+
     return response
 
 
+@app.post("/view/stream")
+async def view_analysis_stream(
+    prompt: str = Form(...),
+    files: list[UploadFile] | None = File(None)
+):
+    prompt = " ".join(prompt.split())
+    if not prompt:
+        raise HTTPException(status_code=400, detail="Prompt cannot be empty")
+
+    extracted_texts = await extract_uploads(files)
+    combined_text = "\n\n".join([text for text in [prompt, *extracted_texts] if text])
+    queue: asyncio.Queue[Dict[str, Any] | None] = asyncio.Queue()
+
+    async def publish_analysis():
+        try:
+            async for node_output in stream_analysis(combined_text):
+                for state_key, value in node_output.items():
+                    await queue.put({"type": ANALYSIS_RESPONSE_KEYS[state_key], "data": value})
+        except Exception as exc:
+            await queue.put({"type": "analysis_error", "data": f"Analysis failed: {exc}"})
+        finally:
+            await queue.put(None)
+
+    async def publish_competitors():
+        try:
+            competitors_result = await company_search_service.find_top_competitors_for_idea(prompt)
+        except Exception as exc:
+            competitors_result = exc
+        await queue.put({"type": "competitors", "data": competitor_response_fields(competitors_result)})
+        await queue.put(None)
+
+    async def events():
+        publishers = [
+            asyncio.create_task(publish_analysis()),
+            asyncio.create_task(publish_competitors())
+        ]
+        try:
+            remaining = len(publishers)
+            while remaining:
+                payload = await queue.get()
+                if payload is None:
+                    remaining -= 1
+                    continue
+                yield sse_event(payload)
+            yield sse_event({"type": "done"})
+        finally:
+            for publisher in publishers:
+                publisher.cancel()
+
+    return StreamingResponse(events(), media_type="text/event-stream")
+
+
+@app.post("/webhooks/exa")
+async def exa_webhook(request: Request):
+    body = await request.body()
+    if not company_search_service.verify_webhook_signature(body, request.headers.get("exa-signature")):
+        raise HTTPException(status_code=401, detail="Invalid webhook signature")
+
+    try:
+        event = json.loads(body)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid webhook payload") from None
+    if not isinstance(event, dict):
+        raise HTTPException(status_code=400, detail="Invalid webhook payload")
+
+    handled = company_search_service.handle_webhook_event(event)
+    return {"received": True, "handled": handled}
+
 
 # -------------------------------------------------------------------
 # Run Server
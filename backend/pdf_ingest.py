@@ -1,19 +1,15 @@
 from __future__ import annotations
 
-from io import BytesIO
+from io import SEEK_END
+from typing import BinaryIO
+
 from pypdf import PdfReader
 
 
-def extract_pdf_text(file_bytes: bytes) -> str:
-    if not file_bytes:
+def extract_pdf_text(fp: BinaryIO) -> str:
+    if fp.seek(0, SEEK_END) == 0:
         return ""
+    fp.seek(0)
 
-    reader = PdfReader(BytesIO(file_bytes))
-    extracted_pages: list[str] = []
-
-    for page in reader.pages:
-        page_text = page.extract_text() or ""
-        if page_text:
-            extracted_pages.append(page_text)
-
-    return "\n".join(extracted_pages)
+    reader = PdfReader(fp)
+    return "\n".join(page_text for page in reader.pages if (page_text := page.extract_text()))
@@ -1,5 +1,6 @@
 import asyncio
 import argparse
+import heapq
 import json
 import logging
 import math
@@ -7,35 +8,67 @@ import os
 import re
 from datetime import datetime, timezone
 from html import unescape
+from operator import itemgetter
 from typing import Any, Dict, List, Optional, Tuple
 
 import httpx
+import orjson
 from dotenv import load_dotenv
 
+try:
+    import ahocorasick
+except ImportError:
+    ahocorasick = None
+
 
 logger = logging.getLogger(__name__)
 
 
-PAIN_KEYWORDS = {
+PAIN_KEYWORDS = frozenset(phrase.lower() for phrase in {
     "pain", "problem", "struggle", "hard", "difficult", "broken", "frustrating",
     "friction", "annoying", "slow", "expensive", "manual", "waste", "inefficient",
     "workaround", "clunky", "hate", "stuck"
-}
+})
 
-INTENT_KEYWORDS = {
+INTENT_KEYWORDS = frozenset(phrase.lower() for phrase in {
     "looking for", "need", "wish", "trying to find", "any tool", "recommend",
     "does anyone use", "what do you use", "searching for", "help with"
-}
+})
 
-BUYING_KEYWORDS = {
+BUYING_KEYWORDS = frozenset(phrase.lower() for phrase in {
     "would pay", "willing to pay", "budget", "pricing", "price", "subscription",
     "paid", "buy", "purchase", "cost", "invoice"
-}
+})
 
-SWITCH_KEYWORDS = {
+SWITCH_KEYWORDS = frozenset(phrase.lower() for phrase in {
     "alternative", "switch", "migrate", "replace", "competitor", "leaving", "churn"
+})
+
+_TAG_RE = re.compile(r"<[^>]+>")
+
+HN_TEXT_MAX_CHARS = 4000
+
+_SIGNAL_RANK_KEY = itemgetter("signal_score", "engagement")
+
+SIGNAL_KEYWORDS: Tuple[Tuple[str, frozenset[str]], ...] = (
+    ("pain", PAIN_KEYWORDS),
+    ("intent", INTENT_KEYWORDS),
+    ("buying", BUYING_KEYWORDS),
+    ("switch", SWITCH_KEYWORDS)
+)
+
+_PHRASE_LABELS: Dict[str, str] = {
+    phrase: label
+    for label, phrases in SIGNAL_KEYWORDS
+    for phrase in phrases
 }
 
+if ahocorasick is not None:
+    _PHRASE_AUTOMATON = ahocorasick.Automaton()
+    for _phrase in _PHRASE_LABELS:
+        _PHRASE_AUTOMATON.add_word(_phrase, _phrase)
+    _PHRASE_AUTOMATON.make_automaton()
+
 
 def _to_iso(ts: Optional[float]) -> Optional[str]:
     if ts is None:
@@ -53,10 +86,16 @@ def _safe_int(value: Any, default: int = 0) -> int:
         return default
 
 
-def _strip_html(text: str) -> str:
+def _strip_html(text: str, max_chars: Optional[int] = None) -> str:
     if not text:
         return ""
-    no_tags = re.sub(r"<[^>]+>", " ", text)
+    if max_chars is not None and len(text) > max_chars:
+        text = text[:max_chars]
+        # Drop a tag cut in half by the slice so its markup doesn't leak into the output.
+        open_tag = text.rfind("<")
+        if open_tag > text.rfind(">"):
+            text = text[:open_tag]
+    no_tags = _TAG_RE.sub(" ", text) if "<" in text else text
     return " ".join(unescape(no_tags).split())
 
 
@@ -64,9 +103,17 @@ def _compact(text: str) -> str:
     return " ".join((text or "").split())
 
 
-def _contains_any_phrase(text: str, phrases: set[str]) -> int:
-    lower = text.lower()
-    return sum(1 for phrase in phrases if phrase in lower)
+def _find_phrases(lowered: str) -> set[str]:
+    if ahocorasick is not None:
+        return {phrase for _, phrase in _PHRASE_AUTOMATON.iter(lowered)}
+    return {phrase for phrase in _PHRASE_LABELS if phrase in lowered}
+
+
+def _count_signal_hits(text: str) -> Dict[str, int]:
+    counts = {label: 0 for label, _ in SIGNAL_KEYWORDS}
+    for phrase in _find_phrases(text.lower()):
+        counts[_PHRASE_LABELS[phrase]] += 1
+    return counts
 
 
 def _snippet(text: str, max_len: int = 180) -> str:
@@ -91,6 +138,7 @@ class SocialSignalsService:
         self.timeout_seconds = timeout_seconds
         self.default_limit_per_source = max(1, min(100, default_limit_per_source))
         self.include_hacker_news = include_hacker_news
+        self._client: Optional[httpx.AsyncClient] = None
 
     @classmethod
     def from_env(cls) -> "SocialSignalsService":
@@ -111,6 +159,26 @@ class SocialSignalsService:
             include_hacker_news=include_hn
         )
 
+    def _get_client(self) -> httpx.AsyncClient:
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                timeout=self.timeout_seconds,
+                http2=True,
+                limits=httpx.Limits(max_keepalive_connections=20, max_connections=40)
+            )
+        return self._client
+
+    async def aclose(self) -> None:
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    async def __aenter__(self) -> "SocialSignalsService":
+        return self
+
+    async def __aexit__(self, *exc_info: Any) -> None:
+        await self.aclose()
+
     async def search_reddit_posts(self, space_query: str, limit: Optional[int] = None) -> List[Dict[str, Any]]:
         take = max(1, min(100, limit or self.default_limit_per_source))
         logger.info("social_signals.reddit.search.start limit=%s", take)
@@ -123,10 +191,9 @@ class SocialSignalsService:
         }
         headers = {"User-Agent": self.reddit_user_agent}
 
-        async with httpx.AsyncClient(timeout=self.timeout_seconds) as client:
-            response = await client.get("https://www.reddit.com/search.json", params=params, headers=headers)
-            response.raise_for_status()
-            payload = response.json()
+        response = await self._get_client().get("https://www.reddit.com/search.json", params=params, headers=headers)
+        response.raise_for_status()
+        payload = orjson.loads(response.content)
 
         if isinstance(payload, dict):
             children = payload.get("data", {}).get("children", [])
@@ -143,7 +210,8 @@ class SocialSignalsService:
         results: List[Dict[str, Any]] = []
         for child in children:
             data = child.get("data", {})
-            text = _compact(f"{data.get('title', '')} {data.get('selftext', '')}")
+            title = _compact(data.get("title", ""))
+            text = _compact(f"{title} {data.get('selftext', '')}")
             permalink = data.get("permalink")
             url = f"https://www.reddit.com{permalink}" if permalink else data.get("url")
 
@@ -154,7 +222,7 @@ class SocialSignalsService:
             results.append({
                 "source": "reddit",
                 "id": data.get("id"),
-                "title": _compact(data.get("title", "")),
+                "title": title,
                 "text": text,
                 "url": url,
                 "author": data.get("author"),
@@ -184,14 +252,13 @@ class SocialSignalsService:
             "user.fields": "username,name"
         }
 
-        async with httpx.AsyncClient(timeout=self.timeout_seconds) as client:
-            response = await client.get(
-                "https://api.twitter.com/2/tweets/search/recent",
-                params=params,
-                headers=headers
-            )
-            response.raise_for_status()
-            payload = response.json()
+        response = await self._get_client().get(
+            "https://api.twitter.com/2/tweets/search/recent",
+            params=params,
+            headers=headers
+        )
+        response.raise_for_status()
+        payload = orjson.loads(response.content)
 
         users = {
             user.get("id"): user
@@ -245,14 +312,13 @@ class SocialSignalsService:
             "hitsPerPage": take
         }
 
-        async with httpx.AsyncClient(timeout=self.timeout_seconds) as client:
-            response = await client.get("https://hn.algolia.com/api/v1/search", params=params)
-            response.raise_for_status()
-            payload = response.json()
+        response = await self._get_client().get("https://hn.algolia.com/api/v1/search", params=params)
+        response.raise_for_status()
+        payload = orjson.loads(response.content)
 
         results: List[Dict[str, Any]] = []
         for hit in payload.get("hits", []):
-            text = _strip_html(hit.get("comment_text") or hit.get("story_text") or "")
+            text = _strip_html(hit.get("comment_text") or hit.get("story_text") or "", max_chars=HN_TEXT_MAX_CHARS)
             title = _compact(hit.get("title") or hit.get("story_title") or "")
             if not text and title:
                 text = title
@@ -268,7 +334,7 @@ class SocialSignalsService:
                 "source": "hackernews",
                 "id": hit.get("objectID"),
                 "title": title or None,
-                "text": _compact(text),
+                "text": text,
                 "url": url,
                 "author": hit.get("author"),
                 "community": "hackernews",
@@ -282,10 +348,11 @@ class SocialSignalsService:
 
     def _score_post_signal(self, post: Dict[str, Any]) -> Dict[str, Any]:
         text = f"{post.get('title') or ''} {post.get('text') or ''}".strip()
-        pain_hits = _contains_any_phrase(text, PAIN_KEYWORDS)
-        intent_hits = _contains_any_phrase(text, INTENT_KEYWORDS)
-        buying_hits = _contains_any_phrase(text, BUYING_KEYWORDS)
-        switch_hits = _contains_any_phrase(text, SWITCH_KEYWORDS)
+        hits = _count_signal_hits(text)
+        pain_hits = hits["pain"]
+        intent_hits = hits["intent"]
+        buying_hits = hits["buying"]
+        switch_hits = hits["switch"]
 
         engagement = _safe_int(post.get("engagement"))
         engagement_boost = min(0.25, math.log1p(max(0, engagement)) / 18)
@@ -299,25 +366,21 @@ class SocialSignalsService:
         )
         score = min(1.0, raw_score)
 
-        labels: List[str] = []
-        if pain_hits > 0:
-            labels.append("pain")
-        if intent_hits > 0:
-            labels.append("intent")
-        if buying_hits > 0:
-            labels.append("buying")
-        if switch_hits > 0:
-            labels.append("switch")
+        labels = [label for label, count in hits.items() if count]
 
-        return {
-            **post,
-            "signal_score": round(score, 4),
-            "signal_labels": labels,
-            "pain_hits": pain_hits,
-            "intent_hits": intent_hits,
-            "buying_hits": buying_hits,
-            "switch_hits": switch_hits
-        }
+        post["engagement"] = engagement
+        post["signal_score"] = round(score, 4)
+        post["signal_labels"] = labels
+        post["pain_hits"] = pain_hits
+        post["intent_hits"] = intent_hits
+        post["buying_hits"] = buying_hits
+        post["switch_hits"] = switch_hits
+        return post
+
+    def _score_and_sort(self, posts: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        scored_posts = [self._score_post_signal(post) for post in posts]
+        scored_posts.sort(key=_SIGNAL_RANK_KEY, reverse=True)
+        return scored_posts
 
     def _aggregate_pmf_signals(self, scored_posts: List[Dict[str, Any]], statuses: Dict[str, str]) -> Dict[str, Any]:
         if not scored_posts:
@@ -337,11 +400,19 @@ class SocialSignalsService:
             }
 
         total = len(scored_posts)
-        pain_posts = sum(1 for post in scored_posts if post["pain_hits"] > 0)
-        intent_posts = sum(1 for post in scored_posts if post["intent_hits"] > 0)
-        buying_posts = sum(1 for post in scored_posts if post["buying_hits"] > 0)
-        switch_posts = sum(1 for post in scored_posts if post["switch_hits"] > 0)
-        avg_signal = sum(post["signal_score"] for post in scored_posts) / total
+        pain_posts = intent_posts = buying_posts = switch_posts = 0
+        total_signal = 0.0
+        for post in scored_posts:
+            total_signal += post["signal_score"]
+            if post["pain_hits"] > 0:
+                pain_posts += 1
+            if post["intent_hits"] > 0:
+                intent_posts += 1
+            if post["buying_hits"] > 0:
+                buying_posts += 1
+            if post["switch_hits"] > 0:
+                switch_posts += 1
+        avg_signal = total_signal / total
 
         coverage = sum(1 for status in statuses.values() if status == "completed") / max(1, len(statuses))
         confidence = min(1.0, (total / 40)) * coverage
@@ -355,11 +426,11 @@ class SocialSignalsService:
         else:
             level = "weak"
 
-        top_pain_posts = sorted(
+        top_pain_posts = heapq.nlargest(
+            8,
             (post for post in scored_posts if post["pain_hits"] > 0),
-            key=lambda post: (post["signal_score"], _safe_int(post.get("engagement"))),
-            reverse=True
-        )[:8]
+            key=_SIGNAL_RANK_KEY
+        )
 
         top_pain_snippets = [
             {
@@ -427,11 +498,7 @@ class SocialSignalsService:
                 errors[source] = str(exc)
                 logger.exception("social_signals.collect.source_failed source=%s", source)
 
-        scored_posts = [self._score_post_signal(post) for post in all_posts]
-        scored_posts.sort(
-            key=lambda post: (post["signal_score"], _safe_int(post.get("engagement"))),
-            reverse=True
-        )
+        scored_posts = await asyncio.to_thread(self._score_and_sort, all_posts)
 
         insights = self._aggregate_pmf_signals(scored_posts, statuses)
         logger.info(
@@ -534,24 +601,26 @@ def cli_main() -> int:
 
     service = SocialSignalsService.from_env()
     include_hn = not args.exclude_hn
-    try:
-        if args.summary_only:
-            result = asyncio.run(
-                service.summarize_customer_voice_signals(
+
+    async def _run() -> Any:
+        async with service:
+            if args.summary_only:
+                return await service.summarize_customer_voice_signals(
                     args.idea,
                     limit_per_source=args.limit_per_source,
                     include_hacker_news=include_hn
                 )
+            return await service.collect_customer_voice_signals(
+                args.idea,
+                limit_per_source=args.limit_per_source,
+                include_hacker_news=include_hn
             )
+
+    try:
+        result = asyncio.run(_run())
+        if args.summary_only:
             print(result)
         else:
-            result = asyncio.run(
-                service.collect_customer_voice_signals(
-                    args.idea,
-                    limit_per_source=args.limit_per_source,
-                    include_hacker_news=include_hn
-                )
-            )
             print(json.dumps(result, indent=2, ensure_ascii=True))
     except Exception:
         logger.exception("social_signals.cli.failed")
@@ -1,17 +1,76 @@
 from __future__ import annotations
 
-from langchain_core.documents import Document
-from langchain_text_splitters import RecursiveCharacterTextSplitter
+import re
+from typing import TYPE_CHECKING
 
+if TYPE_CHECKING:
+    from langchain_core.documents import Document
 
-def chunk_text(text: str) -> list[Document]:
+CHUNK_SIZE = 1000
+CHUNK_OVERLAP = 200
+
+# Same preference order as RecursiveCharacterTextSplitter's default separators.
+_SEPARATORS = ("\n\n", "\n", " ")
+_WHITESPACE_RE = re.compile(r"\s")
+_NON_WHITESPACE_RE = re.compile(r"\S")
+
+
+def _split_text(text: str, chunk_size: int, chunk_overlap: int) -> list[str]:
+    chunks: list[str] = []
+    length = len(text)
+    start = 0
+    # First non-whitespace character after the previous chunk; every cut must
+    # land past it so no chunk is made of overlap alone.
+    fresh_start = 0
+
+    while start < length:
+        end = start + chunk_size
+        if end >= length:
+            end = length
+        else:
+            min_cut = max(start, fresh_start)
+            for separator in _SEPARATORS:
+                cut = text.rfind(separator, min_cut, end)
+                if cut > min_cut:
+                    end = cut
+                    break
+
+        chunk = text[start:end].strip()
+        if chunk:
+            chunks.append(chunk)
+
+        next_content = _NON_WHITESPACE_RE.search(text, end)
+        if next_content is None:
+            break
+        fresh_start = next_content.start()
+
+        # Start the next chunk on a word boundary inside the overlap window.
+        overlap_start = end - chunk_overlap
+        boundary = _WHITESPACE_RE.search(text, overlap_start, end) if overlap_start > start else None
+        start = boundary.end() if boundary else end
+
+    return chunks
+
+
+def chunk_text_strings(text: str) -> list[str]:
     if not text or not text.strip():
         return []
+    return _split_text(text, CHUNK_SIZE, CHUNK_OVERLAP)
+
+
+def chunk_text(text: str, *, use_langchain: bool = False) -> list[Document]:
+    from langchain_core.documents import Document
+
+    if use_langchain:
+        if not text or not text.strip():
+            return []
+
+        from langchain_text_splitters import RecursiveCharacterTextSplitter
 
-    splitter = RecursiveCharacterTextSplitter(
-        chunk_size=1000,
-        chunk_overlap=200
-    )
+        splitter = RecursiveCharacterTextSplitter(
+            chunk_size=CHUNK_SIZE,
+            chunk_overlap=CHUNK_OVERLAP
+        )
+        return splitter.split_documents([Document(page_content=text)])
 
-    docs = [Document(page_content=text)]
-    return splitter.split_documents(docs)
+    return [Document(page_content=chunk) for chunk in chunk_text_strings(text)]